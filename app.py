@@ -1,10 +1,23 @@
+import asyncio
+import hashlib
 import logging
 import os
 import subprocess
-import json
-import urllib.request
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+import diskcache
+import orjson
+import requests
 from fastapi import FastAPI, HTTPException
-from web3 import Web3
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import AsyncWeb3, Web3, WebSocketProvider
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,124 +26,464 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 NODE_API_URL = os.getenv("NODE_API_URL")
+NODE_WS_URL = os.getenv("NODE_WS_URL")
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY", "").strip() or None
+PROBES_PER_BATCH = 32
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+RESPONSE_CACHE_TTL = 300  # seconds; balances and tx counts move, creation data and bytecode don't
+MEMORY_CACHE_SIZE = 1024
+SLITHER_WORKERS = int(os.getenv("SLITHER_WORKERS", "2"))
+SLITHER_TIMEOUT = 180  # seconds, shared by pool wait, compile and detectors; stays under the UI's 240s
+LATEST_BLOCK_TTL = 12  # seconds, one mainnet slot when polling eth_blockNumber
+NEW_HEADS_TTL = 24  # seconds, two slots so a live newHeads feed never falls back to polling
+PENALTIES = {"critical": 25, "high": 15, "medium": 5}  # score points deducted per finding
+NO_CODE_ERROR = "Address has no contract code (EOA or self-destructed)."
+# Only high/medium detectors affect the score, so skip the rest.
+SLITHER_DETECTOR_FILTERS = ["--exclude-low", "--exclude-informational", "--exclude-optimization"]
+
+
+@dataclass(slots=True, frozen=True)
+class Finding:
+    description: str
+    impact: str
+    detector: str
+    source: str
+
+
+# Shared node session: enough pooled keep-alive connections for the parallel lookups
+# and Slither workers, so concurrent RPCs don't queue on requests' default pool of 10.
+_node_session = requests.Session()
+_node_session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=3))
 
 w3 = None
 try:
-    w3 = Web3(Web3.HTTPProvider(NODE_API_URL))
+    w3 = Web3(Web3.HTTPProvider(NODE_API_URL, session=_node_session, request_kwargs={"timeout": 10}))
     if not w3.is_connected():
         raise ConnectionError("Web3 client could not connect to node provider.")
     logger.info("Web3 connected successfully.")
 except Exception as e:
     logger.error(f"Error initializing Web3: {e}")
 
-app = FastAPI()
+
+def _use_node_session():
+    """Executor initializer: web3 caches HTTP sessions per thread, so give each worker the pooled one."""
+    if w3:
+        w3.provider._request_session_manager.cache_and_return_session(w3.provider.endpoint_uri, _node_session)
+
+
+_disk_cache = diskcache.Cache(CACHE_DIR)
+_memory_cache = OrderedDict()  # LRU in front of the disk cache, permanent entries only
+_memory_cache_lock = threading.Lock()
+
+# Slither runs are long subprocesses: bound how many run at once and let concurrent
+# requests for the same address share one run instead of compiling it twice.
+_slither_pool = ThreadPoolExecutor(
+    max_workers=SLITHER_WORKERS, thread_name_prefix="slither", initializer=_use_node_session,
+)
+_slither_jobs = {}
+_slither_jobs_lock = threading.Lock()
+
+_latest_block = (None, 0.0, LATEST_BLOCK_TTL)  # (block number, time fetched, ttl); kept current by _follow_new_heads when NODE_WS_URL is set
+
+# One pooled session for Etherscan/GoPlus/CoinGecko: reuses TLS connections and
+# retries rate limits (Etherscan returns 429 often) instead of failing the request.
+_http_session = requests.Session()
+_http_session.headers["User-Agent"] = "s-scan/1.0"
+_http_session.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+
+async def _follow_new_heads():
+    """Track the chain head over a newHeads subscription so requests don't poll eth_blockNumber."""
+    global _latest_block
+    while True:
+        try:
+            async with AsyncWeb3(WebSocketProvider(NODE_WS_URL)) as ws:
+                await ws.eth.subscribe("newHeads")
+                logger.info("Subscribed to newHeads.")
+                async for message in ws.socket.process_subscriptions():
+                    _latest_block = (message["result"]["number"], time.time(), NEW_HEADS_TTL)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"newHeads subscription dropped, reconnecting: {e}")
+            await asyncio.sleep(5)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # asyncio.to_thread workers get the pooled node session too; sized like asyncio's own default.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4), initializer=_use_node_session),
+    )
+    head_task = asyncio.create_task(_follow_new_heads()) if NODE_WS_URL else None
+    yield
+    if head_task:
+        head_task.cancel()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 
 @app.get("/risk-score/{address}")
-def get_risk_data(address: str):
+async def get_risk_data(address: str):
+    """Stream the report as NDJSON: a "metrics" record, then an "analysis" record.
+
+    Age, balance and tx activity are sent as soon as they're ready so clients can
+    render them while Slither is still running.
+    """
     try:
         checksum_address = Web3.to_checksum_address(address)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid Ethereum address format.")
 
-    age_data = get_contract_age(checksum_address)
-    analysis_data = get_combined_analysis(checksum_address)
-    tvl_data = get_tvl_data(checksum_address)
-    tx_data = get_tx_data(checksum_address)
-
-    raw_score = 100
-    if not analysis_data.get("error"):
-        raw_score -= int(analysis_data.get("critical", 0) * 25)
-        raw_score -= int(analysis_data.get("high", 0) * 15)
-        raw_score -= int(analysis_data.get("medium", 0) * 5)
-
-    return {
+    # Caches and in-flight jobs key on the raw 20-byte address: cheaper to hash than the 42-char string
+    addr_key = bytes.fromhex(checksum_address[2:])
+    return StreamingResponse(
+        _risk_data_records(checksum_address, addr_key),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _risk_data_records(checksum_address: str, addr_key: bytes):
+    cache_key = ("risk-score", addr_key)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        for record in cached:
+            yield orjson.dumps(record) + b"\n"
+        return
+
+    # Independent blocking lookups run side by side; the slow analysis starts first
+    # and is only awaited after the quick metrics have been sent.
+    analysis_job = asyncio.ensure_future(get_combined_analysis(checksum_address, addr_key))
+    age_data, tvl_data, tx_data = await asyncio.gather(
+        asyncio.to_thread(get_contract_age, checksum_address, addr_key),
+        asyncio.to_thread(get_tvl_data, checksum_address),
+        asyncio.to_thread(get_tx_data, checksum_address),
+    )
+    metrics = {
+        "stage": "metrics",
         "contract_address": checksum_address,
         "age_data": age_data,
         "tvl_data": tvl_data,
         "tx_data": tx_data,
-        "analysis_data": analysis_data,
-        "final_score": max(0, raw_score),
     }
+    yield orjson.dumps(metrics) + b"\n"
+
+    analysis_data = await analysis_job
+    raw_score = 100
+    if not analysis_data.get("error"):
+        raw_score -= sum(penalty * analysis_data.get(impact, 0) for impact, penalty in PENALTIES.items())
+
+    analysis = {
+        "stage": "analysis",
+        "analysis_data": {
+            **analysis_data,
+            "findings_list": [asdict(f) for f in analysis_data["findings_list"]],
+        },
+        "final_score": max(0, min(100, raw_score)),
+    }
+    yield orjson.dumps(analysis) + b"\n"
+    if not _has_lookup_errors(age_data, tvl_data, tx_data, analysis_data):
+        _cache_set(cache_key, (metrics, analysis), expire=RESPONSE_CACHE_TTL)
+
+
+def _has_lookup_errors(age_data: dict, tvl_data: dict, tx_data: dict, analysis_data: dict) -> bool:
+    """True if any section failed; such responses are not cached so a transient error isn't replayed."""
+    return bool(
+        age_data.get("error")
+        or tx_data.get("error")
+        or tvl_data.get("error")
+        or tvl_data.get("tvl_score_status") != "success"
+        or analysis_data.get("slither_error")
+        or analysis_data.get("goplus_error")
+    )
+
+
+def _cache_get(key):
+    with _memory_cache_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+
+    value, expire_time = _disk_cache.get(key, expire_time=True)
+    if value is not None and expire_time is None:
+        _memory_cache_put(key, value)
+    return value
+
+
+def _cache_set(key, value, expire=None):
+    """Store on disk; entries without an expiry are also kept in the in-process LRU."""
+    _disk_cache.set(key, value, expire=expire)
+    if expire is None:
+        _memory_cache_put(key, value)
 
 
-def get_contract_age(address: str) -> dict:
+def _memory_cache_put(key, value):
+    with _memory_cache_lock:
+        _memory_cache[key] = value
+        _memory_cache.move_to_end(key)
+        if len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def _get_json(url: str, timeout: int) -> dict:
+    r = _http_session.get(url, timeout=timeout)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+
+def _creation_tx_via_etherscan(address: str):
+    """Return the contract's creation tx hash from Etherscan, or None if unavailable."""
+    if not ETHERSCAN_API_KEY:
+        return None
+    try:
+        url = (
+            f"https://api.etherscan.io/v2/api?chainid=1&module=contract&action=getcontractcreation"
+            f"&contractaddresses={address}&apikey={ETHERSCAN_API_KEY}"
+        )
+        data = _get_json(url, timeout=10)
+
+        if data.get("status") != "1" or not data.get("result"):
+            return None
+        return data["result"][0]["txHash"]
+    except Exception as e:
+        logger.warning(f"Etherscan contract creation lookup failed: {e}")
+        return None
+
+
+def get_contract_age(address: str, addr_key: bytes) -> dict:
+    """Creation block/date; successful lookups are cached forever since they never change."""
+    cache_key = ("contract-age", addr_key)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
     if not w3 or not w3.is_connected():
         return {"creation_date": None, "error": "Web3 client is not connected."}
 
-    start_block = 0
-    end_block = w3.eth.block_number
-    creation_block = None
-
     try:
-        while start_block <= end_block:
-            mid_block = (start_block + end_block) // 2
-            code = w3.eth.get_code(address, block_identifier=mid_block)
-            if code and code != b"0x":
-                creation_block = mid_block
-                end_block = mid_block - 1
-            else:
-                start_block = mid_block + 1
+        tx_hash = _creation_tx_via_etherscan(address)
+        if tx_hash:
+            creation_block = w3.eth.get_transaction(tx_hash)["blockNumber"]
+        elif not _has_code(w3.eth.get_code(address)):
+            return {"creation_date": None, "error": NO_CODE_ERROR}
+        else:
+            creation_block = _find_creation_block(address)
 
         if creation_block:
             block = w3.eth.get_block(creation_block)
-            return {
+            age_data = {
                 "creation_date": int(block["timestamp"]),
                 "block_number": creation_block,
             }
+            _cache_set(cache_key, age_data)
+            return age_data
         return {"creation_date": None, "error": "Contract code not found on chain."}
 
     except Exception as e:
         return {"creation_date": None, "error": f"Web3 lookup failed: {str(e)}"}
 
 
-def run_slither(address: str) -> dict:
-    empty = {"critical": 0, "high": 0, "medium": 0, "low": 0, "findings_list": []}
+def _find_creation_block(address: str):
+    """Fallback: narrow down the first block with code at this address.
 
-    if not ETHERSCAN_API_KEY:
-        return {**empty, "error": "Etherscan API key not configured."}
+    Each round sends its eth_getCode probes as one JSON-RPC batch and shrinks the
+    search range to the gap before the first probe that has code. The first round
+    gallops back from the head (latest, latest-1, latest-2, latest-4, ...) so recent
+    contracts land in a small gap; later rounds use PROBES_PER_BATCH even steps.
+    """
+    creation_block = _search_creation_block(address, _latest_block_number())
+    if creation_block is None:
+        # The cached head can trail a contract deployed in the last block or two; retry from a fresh one
+        creation_block = _search_creation_block(address, _latest_block_number(refresh=True))
+    return creation_block
+
+
+def _search_creation_block(address: str, end_block: int):
+    start_block = 0
+    creation_block = None
+    blocks = _gallop_blocks(end_block)
+
+    while start_block <= end_block:
+        codes = _get_code_batch(address, blocks)
+        first = next((i for i, code in enumerate(codes) if _has_code(code)), None)
+        if first is None:
+            break
+        creation_block = blocks[first]
+        if first == 0:
+            break
+        start_block, end_block = blocks[first - 1] + 1, blocks[first] - 1
+        blocks = _probe_blocks(start_block, end_block)
+
+    return creation_block
+
+
+def _gallop_blocks(latest: int) -> list:
+    """latest, latest-1, latest-2, latest-4, ... down to block 0, ascending."""
+    blocks = {0, latest}
+    step = 1
+    while step < latest:
+        blocks.add(latest - step)
+        step *= 2
+    return sorted(blocks)
+
+
+def _latest_block_number(refresh: bool = False) -> int:
+    """Latest block number from the newHeads feed, or polled when that is stale or not configured."""
+    global _latest_block
+    number, fetched_at, ttl = _latest_block
+    if refresh or number is None or time.time() - fetched_at > ttl:
+        number = w3.eth.block_number
+        _latest_block = (number, time.time(), LATEST_BLOCK_TTL)
+    return number
+
+
+def _probe_blocks(start_block: int, end_block: int) -> list:
+    """Evenly spaced blocks across [start_block, end_block], both ends included."""
+    span = end_block - start_block
+    if span < PROBES_PER_BATCH:
+        return list(range(start_block, end_block + 1))
+    return [start_block + span * i // (PROBES_PER_BATCH - 1) for i in range(PROBES_PER_BATCH)]
+
+
+def _get_code_batch(address: str, blocks: list) -> list:
+    with w3.batch_requests() as batch:
+        for block in blocks:
+            batch.add(w3.eth.get_code(address, block_identifier=block))
+        return batch.execute()
+
+
+def _has_code(code) -> bool:
+    return bool(code) and code != b"0x"
+
+
+def run_slither(address: str, addr_key: bytes, deadline: float) -> dict:
+    """Slither findings, cached forever per (address, bytecode hash) as deployed code is immutable."""
+    code = _get_code(address)
+    if code is not None and not _has_code(code):
+        # EOA: nothing to compile, skip the Etherscan source fetch and Slither entirely
+        return {"critical": 0, "high": 0, "medium": 0, "low": 0, "findings_list": [], "error": NO_CODE_ERROR}
+
+    code_hash = hashlib.sha256(bytes(code)).hexdigest() if code is not None else None
+    cache_key = ("slither", addr_key, code_hash, tuple(SLITHER_DETECTOR_FILTERS))
+    if code_hash:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+    findings = _run_slither_cli(address, code_hash, deadline)
+    if code_hash and not findings.get("error"):
+        _cache_set(cache_key, findings)
+    return findings
+
+
+def _get_code(address: str):
+    """Deployed bytecode at the latest block, or None if it couldn't be fetched."""
+    if not w3:
+        return None
+    try:
+        return w3.eth.get_code(address)
+    except Exception as e:
+        logger.warning(f"Bytecode lookup failed: {e}")
+        return None
+
+
+def _compile(address: str, code_hash, deadline: float):
+    """Compile once per deployed bytecode; returns (Slither target, error).
+
+    Verified source behind a deployed bytecode never changes, so crytic-compile's
+    output is kept on disk and every later Slither run loads it instead of
+    refetching from Etherscan and rerunning solc. Without a bytecode hash there is
+    nothing to key on, so Slither is pointed at the address and compiles itself.
+    """
+    if not code_hash:
+        return address, None
 
+    zip_path = os.path.join(CACHE_DIR, "compilations", f"{address}-{code_hash[:16]}.zip")
+    if os.path.isfile(zip_path):
+        return zip_path, None
+
+    os.makedirs(os.path.dirname(zip_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".zip", dir=os.path.dirname(zip_path))
+    os.close(fd)
     try:
         result = subprocess.run(
-            ["slither", address, "--etherscan-apikey", ETHERSCAN_API_KEY, "--json", "-"],
+            ["crytic-compile", address, "--etherscan-apikey", ETHERSCAN_API_KEY, "--export-zip", tmp_path],
             capture_output=True,
             text=True,
-            timeout=180,
-            env={**os.environ, "ETHERSCAN_API_KEY": ETHERSCAN_API_KEY},
+            timeout=_remaining(deadline, "crytic-compile"),
         )
+        if result.returncode != 0 or not os.path.getsize(tmp_path):
+            return None, f"Compilation failed: {result.stderr.strip()[:500]}"
+        os.replace(tmp_path, zip_path)
+        return zip_path, None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-        if not result.stdout.strip():
-            return {**empty, "error": f"Slither produced no output: {result.stderr.strip()[:500]}"}
 
-        output = json.loads(result.stdout)
+def _run_detectors(target: str, deadline: float) -> dict:
+    """Run the score-relevant detectors over a compiled target and bucket the results."""
+    empty = {"critical": 0, "high": 0, "medium": 0, "low": 0, "findings_list": []}
 
-        if not output.get("success"):
-            return {**empty, "error": output.get("error") or "Slither reported failure."}
+    result = subprocess.run(
+        ["slither", target, "--etherscan-apikey", ETHERSCAN_API_KEY, *SLITHER_DETECTOR_FILTERS, "--json", "-"],
+        capture_output=True,
+        text=True,
+        timeout=_remaining(deadline, "slither"),
+    )
 
-        findings = {**empty}
-        for d in output.get("results", {}).get("detectors", []):
-            impact = d.get("impact", "Informational").lower()
-            if impact == "critical":
-                findings["critical"] += 1
-            elif impact == "high":
-                findings["high"] += 1
-            elif impact == "medium":
-                findings["medium"] += 1
-            else:
-                findings["low"] += 1
-            findings["findings_list"].append({
-                "description": d.get("description", "").strip(),
-                "impact": impact,
-                "detector": d.get("check", "unknown"),
-                "source": "Slither",
-            })
+    if not result.stdout.strip():
+        return {**empty, "error": f"Slither produced no output: {result.stderr.strip()[:500]}"}
 
-        return findings
+    output = orjson.loads(result.stdout)
 
-    except subprocess.TimeoutExpired:
-        return {**empty, "error": "Analysis timed out after 180s."}
-    except json.JSONDecodeError as e:
+    if not output.get("success"):
+        return {**empty, "error": output.get("error") or "Slither reported failure."}
+
+    findings = {**empty}
+    findings_list = findings["findings_list"]
+    for d in output.get("results", {}).get("detectors", []):
+        impact = d.get("impact", "Informational").lower()
+        findings[impact if impact in ("critical", "high", "medium") else "low"] += 1
+        findings_list.append(Finding(
+            d.get("description", "").strip(), impact, d.get("check", "unknown"), "Slither",
+        ))
+
+    return findings
+
+
+def _remaining(deadline: float, cmd: str) -> float:
+    """Seconds left in the Slither budget; raises TimeoutExpired for `cmd` once it's spent."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        # List form, like the argv subprocess.run puts on its own TimeoutExpired
+        raise subprocess.TimeoutExpired([cmd], SLITHER_TIMEOUT)
+    return remaining
+
+
+def _run_slither_cli(address: str, code_hash, deadline: float) -> dict:
+    empty = {"critical": 0, "high": 0, "medium": 0, "low": 0, "findings_list": []}
+
+    if not ETHERSCAN_API_KEY:
+        return {**empty, "error": "Etherscan API key not configured."}
+    if time.monotonic() >= deadline:
+        return {**empty, "error": f"Timed out after {SLITHER_TIMEOUT}s waiting for a Slither worker."}
+
+    try:
+        target, error = _compile(address, code_hash, deadline)
+        if error:
+            return {**empty, "error": error}
+        return _run_detectors(target, deadline)
+
+    except subprocess.TimeoutExpired as e:
+        stage = "Compilation" if e.cmd[0] == "crytic-compile" else "Analysis"
+        return {**empty, "error": f"{stage} timed out ({SLITHER_TIMEOUT}s budget for compile + analysis)."}
+    except orjson.JSONDecodeError as e:
         return {**empty, "error": f"Failed to parse Slither output: {e}"}
     except FileNotFoundError:
         return {**empty, "error": "slither not installed or not in PATH."}
@@ -142,9 +495,7 @@ def run_goplus(address: str) -> dict:
     empty = {"critical": 0, "high": 0, "medium": 0, "low": 0, "findings_list": []}
     try:
         url = f"https://api.gopluslabs.io/api/v1/token_security/1?contract_addresses={address.lower()}"
-        req = urllib.request.Request(url, headers={"User-Agent": "s-scan/1.0"})
-        with urllib.request.urlopen(req, timeout=15) as r:
-            data = json.loads(r.read().decode("utf-8"))
+        data = _get_json(url, timeout=15)
 
         if data.get("code") != 1:
             return {**empty, "error": f"GoPlus error: {data.get('message')}"}
@@ -172,12 +523,7 @@ def run_goplus(address: str) -> dict:
             is_bad = (val == "0") if inverted else (val == "1")
             if is_bad:
                 findings[impact] += 1
-                findings["findings_list"].append({
-                    "description": description,
-                    "impact": impact,
-                    "detector": flag,
-                    "source": "GoPlus",
-                })
+                findings["findings_list"].append(Finding(description, impact, flag, "GoPlus"))
 
         return findings
 
@@ -185,9 +531,33 @@ def run_goplus(address: str) -> dict:
         return {**empty, "error": str(e)}
 
 
-def get_combined_analysis(address: str) -> dict:
-    slither = run_slither(address)
-    goplus = run_goplus(address)
+def _submit_slither(address: str, addr_key: bytes):
+    with _slither_jobs_lock:
+        job = _slither_jobs.get(addr_key)
+        if job is not None:
+            return job
+        # The budget starts at submission so time queued for a worker counts against it
+        job = _slither_pool.submit(run_slither, address, addr_key, time.monotonic() + SLITHER_TIMEOUT)
+        _slither_jobs[addr_key] = job
+
+    def _forget(done):
+        with _slither_jobs_lock:
+            if _slither_jobs.get(addr_key) is done:
+                del _slither_jobs[addr_key]
+
+    job.add_done_callback(_forget)
+    return job
+
+
+async def get_combined_analysis(address: str, addr_key: bytes) -> dict:
+    # Await the Slither pool future on the event loop rather than parking a default-executor
+    # thread on it for the whole run, which would starve the other requests' lookups.
+    # Shielded because the job is shared: a client disconnecting cancels its own wait,
+    # not the run every other request for this address is waiting on.
+    slither, goplus = await asyncio.gather(
+        asyncio.shield(asyncio.wrap_future(_submit_slither(address, addr_key))),
+        asyncio.to_thread(run_goplus, address),
+    )
 
     combined = {
         "critical": slither.get("critical", 0) + goplus.get("critical", 0),
@@ -216,8 +586,7 @@ def get_tx_data(address: str) -> dict:
             f"https://api.etherscan.io/api?module=account&action=txlist"
             f"&address={address}&page=1&offset=500&sort=desc&apikey={ETHERSCAN_API_KEY}"
         )
-        with urllib.request.urlopen(urllib.request.Request(url), timeout=15) as r:
-            data = json.loads(r.read().decode("utf-8"))
+        data = _get_json(url, timeout=15)
 
         if data.get("status") != "1":
             return {"tx_count_30d": "0", "last_active": None}
@@ -247,8 +616,7 @@ def get_tvl_data(address: str) -> dict:
         eth_balance = w3.eth.get_balance(address) / 1e18
 
         cg_url = "https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd"
-        with urllib.request.urlopen(urllib.request.Request(cg_url), timeout=10) as r:
-            price_data = json.loads(r.read().decode("utf-8"))
+        price_data = _get_json(cg_url, timeout=10)
 
         eth_price = price_data.get("ethereum", {}).get("usd", 0)
 
@@ -1,6 +1,8 @@
 import os
 import datetime
 import json
+import threading
+import time
 import urllib.request
 import streamlit as st
 import pandas as pd
@@ -28,6 +30,8 @@ NODE_API_URL = _secret("NODE_API_URL")
 ETHERSCAN_API_KEY = (_secret("ETHERSCAN_API_KEY") or "").strip() or None
 FASTAPI_BASE_URL = _secret("FASTAPI_BASE_URL")  # set in Docker, absent on Streamlit Cloud
 DEFAULT_ADDRESS = "0x514910771AF9Ca6566aF840dFf83E8264EcF986CA"
+BACKEND_CACHE_TTL = 300  # seconds
+PENALTIES = {"critical": 25, "high": 15, "medium": 5}  # score points deducted per finding
 
 
 @st.cache_resource
@@ -169,19 +173,25 @@ def get_tx_data(address: str) -> dict:
 def compute_score(age_data: dict, analysis_data: dict, tvl_data: dict) -> int:
     raw = 100
     if not analysis_data.get("error"):
-        raw -= analysis_data.get("critical", 0) * 25
-        raw -= analysis_data.get("high", 0) * 15
-        raw -= analysis_data.get("medium", 0) * 5
-    return max(0, raw)
+        raw -= sum(penalty * analysis_data.get(impact, 0) for impact, penalty in PENALTIES.items())
+    return max(0, min(100, raw))
 
 
-def fetch_direct(address: str) -> dict:
-    """Full analysis without a backend — used on Streamlit Cloud."""
+class _UncachedResult(Exception):
+    """Raised out of a cached function to return a result without st.cache_data storing it."""
+
+    def __init__(self, data: dict):
+        super().__init__()
+        self.data = data
+
+
+@st.cache_data(ttl=300)
+def _fetch_direct_cached(address: str) -> dict:
     age = get_contract_age(address)
     analysis = run_security_analysis(address)
     tvl = get_tvl_data(address)
     tx = get_tx_data(address)
-    return {
+    data = {
         "contract_address": address,
         "age_data": age,
         "tvl_data": tvl,
@@ -189,15 +199,91 @@ def fetch_direct(address: str) -> dict:
         "analysis_data": analysis,
         "final_score": compute_score(age, analysis, tvl),
     }
+    # The lookups report failures as error fields rather than raising; keep those out of the cache
+    if age.get("error") or analysis.get("error") or tx.get("error") or tvl.get("tvl_score_status") != "success":
+        raise _UncachedResult(data)
+    return data
+
+
+def fetch_direct(address: str) -> dict:
+    """Full analysis without a backend — used on Streamlit Cloud."""
+    try:
+        return _fetch_direct_cached(address)
+    except _UncachedResult as e:
+        return e.data
+
+
+def _has_section_errors(data: dict) -> bool:
+    """True if any section of a backend response reports an error."""
+    age, tvl, tx, analysis = (data.get(k, {}) for k in ("age_data", "tvl_data", "tx_data", "analysis_data"))
+    return bool(
+        age.get("error")
+        or tx.get("error")
+        or tvl.get("error")
+        or tvl.get("tvl_score_status") != "success"
+        or analysis.get("error")
+        or analysis.get("slither_error")
+        or analysis.get("goplus_error")
+    )
 
 
-def fetch_from_backend(address: str):
-    """Calls FastAPI backend (Docker mode — includes Slither analysis)."""
+@st.cache_resource
+def _backend_results():
+    """(results, lock): checksum address -> (fetched_at, data), shared across sessions.
+
+    Every session thread reads and writes the same dict, so all access holds the lock.
+    Entries older than BACKEND_CACHE_TTL are ignored on read and pruned on write.
+    """
+    return {}, threading.Lock()
+
+
+def fetch_from_backend(address: str, on_stage=None):
+    """Calls FastAPI backend (Docker mode — includes Slither analysis).
+
+    The backend streams NDJSON: a "metrics" record as soon as age/balance/tx are
+    known, then an "analysis" record once Slither finishes. on_stage(stage, data)
+    is called after each record so the page can render progressively.
+    """
     import requests as req_lib
     try:
-        r = req_lib.get(f"{FASTAPI_BASE_URL}/{address}", timeout=240)
-        r.raise_for_status()
-        return r.json()
+        address = Web3.to_checksum_address(address.strip())
+    except ValueError:
+        st.error("Invalid Ethereum address format.")
+        return None
+
+    results, lock = _backend_results()
+    now = time.time()
+    with lock:
+        cached = results.get(address)
+    if cached and now - cached[0] < BACKEND_CACHE_TTL:
+        return cached[1]
+
+    try:
+        data = {}
+        with req_lib.get(f"{FASTAPI_BASE_URL}/{address}", stream=True, timeout=240) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                record = json.loads(line)
+                stage = record.pop("stage")
+                data.update(record)
+                if on_stage:
+                    on_stage(stage, data)
+
+        if "final_score" not in data:
+            st.error("Backend response ended before the analysis finished.")
+            return None
+
+        # Like the backend's own cache, keep errored results out so a Slither timeout or a
+        # transient GoPlus failure isn't replayed to every session
+        if not _has_section_errors(data):
+            now = time.time()
+            with lock:
+                for key in [k for k, (fetched_at, _) in results.items() if now - fetched_at >= BACKEND_CACHE_TTL]:
+                    del results[key]
+                results[address] = (now, data)
+        return data
     except req_lib.exceptions.ConnectionError:
         st.error("Cannot reach FastAPI backend.")
     except req_lib.exceptions.Timeout:
@@ -312,6 +398,93 @@ def generate_pdf(data: dict) -> bytes:
     return bytes(pdf.output())
 
 
+@st.cache_data(ttl=BACKEND_CACHE_TTL, max_entries=256)
+def _findings_df(findings_json: str) -> pd.DataFrame:
+    """Findings table, cached on the JSON-serialized list so re-renders skip DataFrame construction."""
+    return pd.DataFrame(json.loads(findings_json))
+
+
+def render_metrics(data: dict, slots: dict):
+    slots["header"].subheader(f"Results for: `{data['contract_address']}`")
+
+    with slots["metrics"].container():
+        st.markdown("---")
+        col1, col2, col3 = st.columns(3)
+
+        age_ts = data["age_data"].get("creation_date")
+        age_display = pd.to_datetime(age_ts, unit="s").strftime("%Y-%m-%d") if age_ts else "N/A"
+        block_num = data["age_data"].get("block_number", "N/A")
+
+        with col1:
+            st.metric("Contract Creation Date", age_display)
+            st.metric("Creation Block", f"{block_num:,}" if isinstance(block_num, int) else block_num)
+
+        eth_balance = data["tvl_data"].get("eth_balance")
+        tvl_usd = data["tvl_data"].get("tvl_usd", 0)
+
+        with col2:
+            st.metric("ETH Held by Contract", f"{eth_balance:,.4f} ETH" if eth_balance is not None else "N/A")
+            st.metric("ETH Value (USD)", f"${tvl_usd:,.2f}")
+
+        tx = data.get("tx_data", {})
+        last_active_ts = tx.get("last_active")
+        last_active_display = (
+            pd.to_datetime(last_active_ts, unit="s").strftime("%Y-%m-%d")
+            if last_active_ts else "N/A"
+        )
+        with col3:
+            st.metric("Transactions (last 30d)", tx.get("tx_count_30d", "N/A"))
+            st.metric("Last Active", last_active_display)
+
+
+def render_analysis(data: dict, slots: dict):
+    score = data["final_score"]
+    score_color = "green" if score == 100 else ("orange" if score >= 60 else "red")
+    score_label = "No red flags detected" if score == 100 else f"{100 - score} points deducted for findings"
+
+    slots["score"].markdown(
+        f"""
+        <div style='background-color:#f0f2f6;padding:20px;border-radius:10px;text-align:center;'>
+            <h2 style='color:#262730;'>SECURITY SCORE</h2>
+            <h1 style='color:{score_color};font-size:80px;'>{score} / 100</h1>
+            <p style='color:#555;'>{score_label}</p>
+            <p style='color:#aaa;font-size:12px;'>100 = no detectable red flags &nbsp;·&nbsp; a high score does not mean the contract is safe</p>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    with slots["findings"].container():
+        analysis = data["analysis_data"]
+        st.markdown("---")
+        source_label = analysis.get("source", "Security Analysis")
+        st.subheader(f"Vulnerability Findings ({source_label})")
+
+        if analysis.get("error"):
+            st.warning(f"Note: {analysis['error']}")
+        else:
+            st.table(pd.DataFrame({
+                "Impact": ["Critical", "High", "Medium", "Low"],
+                "Count": [
+                    analysis.get("critical", 0), analysis.get("high", 0),
+                    analysis.get("medium", 0),   analysis.get("low", 0),
+                ],
+            }))
+            findings_list = analysis.get("findings_list", [])
+            if findings_list:
+                st.dataframe(_findings_df(json.dumps(findings_list)), width="stretch")
+            else:
+                st.info("No vulnerabilities detected.")
+
+        st.markdown("---")
+        st.download_button(
+            label="Export report as PDF",
+            data=generate_pdf(data),
+            file_name=f"security_report_{data['contract_address'][:10]}.pdf",
+            mime="application/pdf",
+        )
+
+
 # ── UI ─────────────────────────────────────────────────────────────────────────
 
 st.title("Smart Contract Security Score Analyzer")
@@ -335,81 +508,18 @@ if st.button("Analyze Contract"):
     if not address:
         st.warning("Please enter a contract address.")
     else:
+        # Slots in page order; the backend fills metrics first and score/findings after Slither.
+        slots = {name: st.empty() for name in ("header", "score", "metrics", "findings")}
+        rendered = set()
+
+        def show_stage(stage: str, data: dict):
+            (render_metrics if stage == "metrics" else render_analysis)(data, slots)
+            rendered.add(stage)
+
         with st.spinner("Analyzing — this may take a minute..."):
-            data = fetch_from_backend(address) if FASTAPI_BASE_URL else fetch_direct(address)
+            data = fetch_from_backend(address, on_stage=show_stage) if FASTAPI_BASE_URL else fetch_direct(address)
 
         if data:
-            st.subheader(f"Results for: `{data['contract_address']}`")
-
-            score = data["final_score"]
-            score_color = "green" if score == 100 else ("orange" if score >= 60 else "red")
-            score_label = "No red flags detected" if score == 100 else f"{100 - score} points deducted for findings"
-
-            st.markdown(
-                f"""
-                <div style='background-color:#f0f2f6;padding:20px;border-radius:10px;text-align:center;'>
-                    <h2 style='color:#262730;'>SECURITY SCORE</h2>
-                    <h1 style='color:{score_color};font-size:80px;'>{score} / 100</h1>
-                    <p style='color:#555;'>{score_label}</p>
-                    <p style='color:#aaa;font-size:12px;'>100 = no detectable red flags &nbsp;·&nbsp; a high score does not mean the contract is safe</p>
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
-
-            st.markdown("---")
-            col1, col2, col3 = st.columns(3)
-
-            age_ts = data["age_data"].get("creation_date")
-            age_display = pd.to_datetime(age_ts, unit="s").strftime("%Y-%m-%d") if age_ts else "N/A"
-            block_num = data["age_data"].get("block_number", "N/A")
-
-            with col1:
-                st.metric("Contract Creation Date", age_display)
-                st.metric("Creation Block", f"{block_num:,}" if isinstance(block_num, int) else block_num)
-
-            eth_balance = data["tvl_data"].get("eth_balance")
-            tvl_usd = data["tvl_data"].get("tvl_usd", 0)
-
-            with col2:
-                st.metric("ETH Held by Contract", f"{eth_balance:,.4f} ETH" if eth_balance is not None else "N/A")
-                st.metric("ETH Value (USD)", f"${tvl_usd:,.2f}")
-
-            analysis = data["analysis_data"]
-            tx = data.get("tx_data", {})
-            last_active_ts = tx.get("last_active")
-            last_active_display = (
-                pd.to_datetime(last_active_ts, unit="s").strftime("%Y-%m-%d")
-                if last_active_ts else "N/A"
-            )
-            with col3:
-                st.metric("Transactions (last 30d)", tx.get("tx_count_30d", "N/A"))
-                st.metric("Last Active", last_active_display)
-
-            st.markdown("---")
-            source_label = analysis.get("source", "Security Analysis")
-            st.subheader(f"Vulnerability Findings ({source_label})")
-
-            if analysis.get("error"):
-                st.warning(f"Note: {analysis['error']}")
-            else:
-                st.table(pd.DataFrame({
-                    "Impact": ["Critical", "High", "Medium", "Low"],
-                    "Count": [
-                        analysis.get("critical", 0), analysis.get("high", 0),
-                        analysis.get("medium", 0),   analysis.get("low", 0),
-                    ],
-                }))
-                findings_list = analysis.get("findings_list", [])
-                if findings_list:
-                    st.dataframe(pd.DataFrame(findings_list), width="stretch")
-                else:
-                    st.info("No vulnerabilities detected.")
-
-            st.markdown("---")
-            st.download_button(
-                label="Export report as PDF",
-                data=generate_pdf(data),
-                file_name=f"security_report_{data['contract_address'][:10]}.pdf",
-                mime="application/pdf",
-            )
+            for stage in ("metrics", "analysis"):
+                if stage not in rendered:
+                    show_stage(stage, data)